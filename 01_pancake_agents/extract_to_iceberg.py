@@ -2,8 +2,13 @@
 Extract Pancake Agents simulation data to Iceberg via Lakekeeper.
 
 This bypasses the normal pipeline to allow direct inspection of simulation data.
+
+Usage:
+    python extract_to_iceberg.py            # Extract, logging estimated source sizes
+    python extract_to_iceberg.py --counts   # Also log exact source row counts (scans each table)
 """
 
+import argparse
 import duckdb
 import os
 
@@ -17,6 +22,9 @@ WAREHOUSE = os.getenv("WAREHOUSE", "iceberg-lakehouse-local")
 # Source DuckDB file
 DUCKDB_PATH = "pancake_world.duckdb"
 
+# Worker threads for the CTAS scans - defaults to one per core
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", os.cpu_count() or 1))
+
 # All tables to extract
 TABLES = [
     "producers",
@@ -32,26 +40,57 @@ TABLES = [
 SCHEMA_NAME = "pancake_simulation"
 
 
+def count_rows(con, tables: list[str], prefix: str = "") -> dict[str, int]:
+    """Get row counts for several tables in a single UNION ALL query."""
+    # Table names are interpolated into SQL, so only accept known tables
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Refusing to query unknown tables: {sorted(unknown)}")
+    if not tables:
+        return {}
+    sql = " UNION ALL ".join(
+        f"SELECT '{table}', COUNT(*) FROM {prefix}{table}" for table in tables
+    )
+    return dict(con.execute(sql).fetchall())
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Extract Pancake Agents simulation data to Iceberg")
+    parser.add_argument("--counts", action="store_true", help="Log exact source row counts (scans each table)")
+    args = parser.parse_args()
+    
     print(f"🥞 Extracting pancake simulation data to Iceberg...")
     print(f"   Source: {DUCKDB_PATH}")
     print(f"   Destination: {WAREHOUSE}.{SCHEMA_NAME}")
     print(f"   Lakekeeper: {LAKEKEEPER_URI}")
     
-    # Connect to local DuckDB file
-    with duckdb.connect(DUCKDB_PATH, read_only=True) as source_con:
-        # Check tables exist
-        existing_tables = [row[0] for row in source_con.execute("SHOW TABLES").fetchall()]
+    # One connection for both sides: source file attached read-only next to the catalog
+    with duckdb.connect() as con:
+        con.execute(f"ATTACH '{DUCKDB_PATH}' AS source_db (READ_ONLY);")
+        
+        # Check which of our tables exist (one bound-parameter query for the whole list);
+        # estimated_size comes from catalog stats, so no table is scanned
+        source_tables = dict(con.execute(
+            """
+            SELECT table_name, estimated_size FROM duckdb_tables()
+            WHERE database_name = 'source_db' AND schema_name = 'main'
+              AND list_contains(?, table_name)
+            """,
+            [TABLES],
+        ).fetchall())
+        existing_tables = list(source_tables)
         print(f"\n📋 Found tables in source: {existing_tables}")
         
-        # Get row counts
-        for table in TABLES:
-            if table in existing_tables:
-                count = source_con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        # Get row counts - exact counts only on request
+        if args.counts:
+            counts = count_rows(con, [t for t in TABLES if t in existing_tables], prefix="source_db.")
+            for table, count in counts.items():
                 print(f"   {table}: {count} rows")
-    
-    # Use separate connection for Iceberg operations
-    with duckdb.connect() as con:
+        else:
+            for table in TABLES:
+                if table in source_tables:
+                    print(f"   {table}: ~{source_tables[table]} rows (estimated)")
+        
         print(f"\n🔌 Connecting to Lakekeeper...")
         con.execute(f"""
             INSTALL iceberg;
@@ -64,24 +103,25 @@ def main():
             );
         """)
         
+        # Tuning for bulk copies: row order doesn't matter for the extract,
+        # so let DuckDB skip order-preserving materialization
+        con.execute(f"""
+            SET preserve_insertion_order = false;
+            SET threads = {DUCKDB_THREADS};
+        """)
+        
         # Create schema
         print(f"\n📁 Creating schema: {SCHEMA_NAME}")
         con.execute(f"CREATE SCHEMA IF NOT EXISTS lakekeeper_catalog.{SCHEMA_NAME};")
         
-        # Attach source DuckDB as a separate database
-        con.execute(f"ATTACH '{DUCKDB_PATH}' AS source_db (READ_ONLY);")
-        
-        # Extract each table
+        # Extract each table - one transaction so the catalog sees a single commit
         print(f"\n🚀 Extracting tables...")
-        for table in TABLES:
-            try:
+        extracted = []
+        con.begin()
+        try:
+            for table in TABLES:
                 # Check if table exists in source
-                exists = con.execute(f"""
-                    SELECT COUNT(*) FROM information_schema.tables 
-                    WHERE table_catalog = 'source_db' AND table_name = '{table}'
-                """).fetchone()[0]
-                
-                if exists == 0:
+                if table not in existing_tables:
                     print(f"   ⏭️  {table}: skipped (not found in source)")
                     continue
                 
@@ -93,13 +133,19 @@ def main():
                     CREATE TABLE lakekeeper_catalog.{SCHEMA_NAME}.{table} AS 
                     SELECT * FROM source_db.{table};
                 """)
-                
-                # Verify
-                count = con.execute(f"SELECT COUNT(*) FROM lakekeeper_catalog.{SCHEMA_NAME}.{table}").fetchone()[0]
+                extracted.append(table)
+            
+            # Verify
+            counts = count_rows(con, extracted, prefix=f"lakekeeper_catalog.{SCHEMA_NAME}.")
+            for table, count in counts.items():
                 print(f"   ✅ {table}: {count} rows extracted")
-                
-            except Exception as e:
-                print(f"   ❌ {table}: failed - {e}")
+            
+            con.commit()
+        except Exception as e:
+            con.rollback()
+            print(f"   ❌ Extraction failed - {e}")
+            print("   ↩️  Rolled back, no tables were changed")
+            raise  # non-zero exit so the Job/CI sees the failure
     
     print(f"\n✨ Extraction complete! Data available at lakekeeper_catalog.{SCHEMA_NAME}.*")
 
@@ -10,17 +10,20 @@ Usage:
 """
 
 import argparse
+import itertools
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from concurrent.futures import ThreadPoolExecutor
+import psycopg
 from datetime import datetime
 from dataclasses import dataclass
-from typing import Optional
-import json
+from typing import NamedTuple, Optional
+import orjson
 import random
+import re
 import time
-import urllib.request
-import urllib.error
+import threading
+import http.client
+import urllib.parse
 
 # =============================================================================
 # Configuration
@@ -38,6 +41,57 @@ NUM_TOPPINGS_PER_PRODUCER = 5
 MAX_TOPPING_SWAPS = 3
 OLLAMA_BASE_URL = "http://localhost:30134"
 OLLAMA_MODEL = "gemma3:1b"
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "10"))  # Concurrent LLM calls per phase
+LLM_DEBUG = os.getenv("LLM_DEBUG", "0") == "1"  # Dump every raw LLM response
+
+# =============================================================================
+# Ollama HTTP Client
+# =============================================================================
+
+# Idle keep-alive connections to Ollama, shared by the LLM worker threads so
+# each call reuses an open socket instead of paying a new TCP handshake
+_ollama_idle_connections: list[http.client.HTTPConnection] = []
+_ollama_pool_lock = threading.Lock()
+
+def _acquire_ollama_connection() -> http.client.HTTPConnection:
+    """Take an idle Ollama connection from the pool, or open a new one."""
+    with _ollama_pool_lock:
+        if _ollama_idle_connections:
+            return _ollama_idle_connections.pop()
+    url = urllib.parse.urlsplit(OLLAMA_BASE_URL)
+    return http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+
+def _release_ollama_connection(conn: http.client.HTTPConnection) -> None:
+    """Return a connection to the pool for the next call."""
+    with _ollama_pool_lock:
+        _ollama_idle_connections.append(conn)
+
+def ollama_request(method: str, path: str, body: Optional[bytes] = None, timeout: float = 60) -> bytes:
+    """Send a request to Ollama over a pooled keep-alive connection and return the response body."""
+    for attempt in range(2):
+        conn = _acquire_ollama_connection()
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # Server closed an idle keep-alive socket - retry once on a fresh one
+            conn.close()
+            if attempt:
+                raise
+            continue
+        except Exception:
+            conn.close()
+            raise
+        
+        _release_ollama_connection(conn)
+        if response.status != 200:
+            raise RuntimeError(f"Ollama returned HTTP {response.status}")
+        return data
 
 # =============================================================================
 # Ollama Health Check
@@ -46,13 +100,12 @@ OLLAMA_MODEL = "gemma3:1b"
 def check_ollama_available() -> bool:
     """Check if Ollama is running and accessible."""
     try:
-        req = urllib.request.Request(OLLAMA_BASE_URL, method="GET")
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                print(f"✅ Ollama is running at {OLLAMA_BASE_URL}")
-                return True
-    except urllib.error.URLError as e:
-        print(f"❌ Ollama not available at {OLLAMA_BASE_URL}: {e.reason}")
+        # Goes through the connection pool, so the tick's first LLM call reuses this socket
+        ollama_request("GET", "/", timeout=5)
+        print(f"✅ Ollama is running at {OLLAMA_BASE_URL}")
+        return True
+    except OSError as e:
+        print(f"❌ Ollama not available at {OLLAMA_BASE_URL}: {e}")
     except Exception as e:
         print(f"❌ Ollama check failed: {e}")
     return False
@@ -61,14 +114,16 @@ def check_ollama_available() -> bool:
 # Data Classes
 # =============================================================================
 
-@dataclass
+# Entity rows use __slots__: fixed fields, faster attribute reads in the
+# per-consumer loops and no per-instance __dict__
+@dataclass(slots=True)
 class Producer:
     id: int
     name: str
     creativity_bias: int  # 1-5
     risk_tolerance: int   # 1-5
 
-@dataclass
+@dataclass(slots=True)
 class Consumer:
     id: int
     openness: int       # 1-5: willingness to try unusual combinations
@@ -77,7 +132,7 @@ class Consumer:
     indulgence: int     # 1-5: preference for rich, decadent options
     nostalgia: int      # 1-5: preference for classic, comforting flavors
 
-@dataclass
+@dataclass(slots=True)
 class Topping:
     id: int
     name: str
@@ -93,8 +148,25 @@ class ConsumerChoice:
     producer_id: int
     enticement_score: int  # 1-10
 
-@dataclass 
-class ProducerHistory:
+@dataclass
+class LookupTables:
+    """Name/ID maps for one tick, built once in run_tick and shared by the phases."""
+    topping_id_to_name: dict[int, str]
+    topping_name_to_id: dict[str, int]
+    producer_id_to_name: dict[int, str]
+    producer_name_to_id: dict[str, int]
+
+    @classmethod
+    def build(cls, producers: list[Producer], all_toppings: list[Topping]) -> "LookupTables":
+        return cls(
+            topping_id_to_name={t.id: t.name for t in all_toppings},
+            topping_name_to_id={t.name: t.id for t in all_toppings},
+            producer_id_to_name={p.id: p.name for p in producers},
+            producer_name_to_id={p.name: p.id for p in producers},
+        )
+
+# NamedTuple rather than dataclass: many rows are built per tick, read-only
+class ProducerHistory(NamedTuple):
     tick_id: int
     consumer_count: int
     market_share: float
@@ -171,8 +243,17 @@ SCHEMA_STATEMENTS = [
     )""",
 ]
 
+# Whole schema as one script, so init sends it to the server in a single round trip
+SCHEMA_SQL = ";\n".join(SCHEMA_STATEMENTS)
+
 # Separate index creation (CREATE UNIQUE INDEX IF NOT EXISTS not universally supported)
-INDEX_SQL = """CREATE UNIQUE INDEX IF NOT EXISTS idx_exclusive_topping ON producer_toppings(tick_id, topping_id)"""
+INDEX_STATEMENTS = [
+    """CREATE UNIQUE INDEX IF NOT EXISTS idx_exclusive_topping ON producer_toppings(tick_id, topping_id)""",
+    # History reads each producer's most recent ticks; the PK leads with tick_id
+    """CREATE INDEX IF NOT EXISTS idx_prs_producer_tick ON producer_round_stats(producer_id, tick_id DESC)""",
+    # Round stats join each producer to its choices within one tick
+    """CREATE INDEX IF NOT EXISTS idx_cc_tick_producer ON consumer_choices(tick_id, producer_id)""",
+]
 
 # =============================================================================
 # Seed Data
@@ -217,28 +298,27 @@ def init_db(conn, reset: bool = False) -> None:
     
     if reset:
         print("🗑️  Dropping all tables...")
-        cur.execute("DROP TABLE IF EXISTS producer_round_stats CASCADE")
-        cur.execute("DROP TABLE IF EXISTS consumer_choices CASCADE")
-        cur.execute("DROP TABLE IF EXISTS producer_toppings CASCADE")
-        cur.execute("DROP TABLE IF EXISTS producer_offerings CASCADE")
-        cur.execute("DROP TABLE IF EXISTS ticks CASCADE")
-        cur.execute("DROP TABLE IF EXISTS toppings CASCADE")
-        cur.execute("DROP TABLE IF EXISTS consumers CASCADE")
-        cur.execute("DROP TABLE IF EXISTS producers CASCADE")
+        cur.execute("""
+            DROP TABLE IF EXISTS
+                producer_round_stats, consumer_choices, producer_toppings, producer_offerings,
+                ticks, toppings, consumers, producers
+            CASCADE
+        """)
         conn.commit()
     
     print("📋 Creating schema...")
-    for statement in SCHEMA_STATEMENTS:
-        cur.execute(statement)
-    
-    # Create index (may already exist)
-    try:
-        cur.execute(INDEX_SQL)
-    except psycopg2.errors.DuplicateTable:
-        conn.rollback()  # Index already exists, continue
-    
+    cur.execute(SCHEMA_SQL)
     conn.commit()
     
+    # Create indexes (may already exist) - committed one by one so a
+    # rollback only discards the failed index
+    for statement in INDEX_STATEMENTS:
+        try:
+            cur.execute(statement)
+            conn.commit()
+        except psycopg.errors.DuplicateTable:
+            conn.rollback()  # Index already exists, continue
+    
     # Check if already seeded
     cur.execute("SELECT COUNT(*) FROM producers")
     existing = cur.fetchone()[0]
@@ -249,26 +329,28 @@ def init_db(conn, reset: bool = False) -> None:
     
     print("🌱 Seeding data...")
     
-    # Seed producers - use INSERT with explicit IDs and reset sequence
-    for i, (name, creativity, risk) in enumerate(SEED_PRODUCERS, start=1):
-        cur.execute(
+    # Pipeline mode queues every seed statement and sends them in one round trip
+    with conn.pipeline():
+        # Seed producers - use INSERT with explicit IDs and reset sequence
+        cur.executemany(
             "INSERT INTO producers (id, name, creativity_bias, risk_tolerance) VALUES (%s, %s, %s, %s)",
-            (i, name, creativity, risk)
+            [(i, name, creativity, risk) for i, (name, creativity, risk) in enumerate(SEED_PRODUCERS, start=1)]
         )
-    cur.execute("SELECT setval('producers_id_seq', %s)", (len(SEED_PRODUCERS),))
-    
-    # Seed consumers
-    for i, (openness, pickiness, impulsivity, indulgence, nostalgia) in enumerate(SEED_CONSUMERS, start=1):
-        cur.execute(
+        cur.execute("SELECT setval('producers_id_seq', %s)", (len(SEED_PRODUCERS),))
+        
+        # Seed consumers
+        cur.executemany(
             "INSERT INTO consumers (id, openness, pickiness, impulsivity, indulgence, nostalgia) VALUES (%s, %s, %s, %s, %s, %s)",
-            (i, openness, pickiness, impulsivity, indulgence, nostalgia)
+            [(i, *traits) for i, traits in enumerate(SEED_CONSUMERS, start=1)]
         )
-    cur.execute("SELECT setval('consumers_id_seq', %s)", (len(SEED_CONSUMERS),))
-    
-    # Seed toppings
-    for i, name in enumerate(SEED_TOPPINGS, start=1):
-        cur.execute("INSERT INTO toppings (id, name) VALUES (%s, %s)", (i, name))
-    cur.execute("SELECT setval('toppings_id_seq', %s)", (len(SEED_TOPPINGS),))
+        cur.execute("SELECT setval('consumers_id_seq', %s)", (len(SEED_CONSUMERS),))
+        
+        # Seed toppings
+        cur.executemany(
+            "INSERT INTO toppings (id, name) VALUES (%s, %s)",
+            list(enumerate(SEED_TOPPINGS, start=1))
+        )
+        cur.execute("SELECT setval('toppings_id_seq', %s)", (len(SEED_TOPPINGS),))
     
     conn.commit()
     cur.close()
@@ -278,150 +360,159 @@ def init_db(conn, reset: bool = False) -> None:
 # State Retrieval
 # =============================================================================
 
-def get_producers(conn) -> list[Producer]:
+def get_producers(cur) -> list[Producer]:
     """Get all producers."""
-    cur = conn.cursor()
     cur.execute("SELECT id, name, creativity_bias, risk_tolerance FROM producers ORDER BY id")
     rows = cur.fetchall()
-    cur.close()
     return [Producer(id=r[0], name=r[1], creativity_bias=r[2], risk_tolerance=r[3]) for r in rows]
 
-def get_consumers(conn) -> list[Consumer]:
+def get_consumers(cur) -> list[Consumer]:
     """Get all consumers."""
-    cur = conn.cursor()
     cur.execute("SELECT id, openness, pickiness, impulsivity, indulgence, nostalgia FROM consumers ORDER BY id")
     rows = cur.fetchall()
-    cur.close()
     return [Consumer(id=r[0], openness=r[1], pickiness=r[2], impulsivity=r[3], indulgence=r[4], nostalgia=r[5]) for r in rows]
 
-def get_all_toppings(conn) -> list[Topping]:
+def get_all_toppings(cur) -> list[Topping]:
     """Get all available toppings."""
-    cur = conn.cursor()
     cur.execute("SELECT id, name FROM toppings ORDER BY id")
     rows = cur.fetchall()
-    cur.close()
     return [Topping(id=r[0], name=r[1]) for r in rows]
 
-def get_latest_completed_tick(conn) -> Optional[int]:
-    """Get the most recent completed tick ID, or None if no ticks yet."""
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM ticks WHERE completed_at IS NOT NULL ORDER BY id DESC LIMIT 1")
-    result = cur.fetchone()
-    cur.close()
-    return result[0] if result else None
-
-def get_producer_current_toppings(conn, producer_id: int, tick_id: int) -> list[int]:
-    """Get topping IDs for a producer from a specific tick."""
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT topping_id FROM producer_toppings WHERE producer_id = %s AND tick_id = %s ORDER BY topping_id",
-        (producer_id, tick_id)
-    )
-    rows = cur.fetchall()
-    cur.close()
-    return [r[0] for r in rows]
-
-def get_producer_history(conn, producer_id: int, limit: int = HISTORY_WINDOW) -> list[ProducerHistory]:
-    """Get historical stats for a producer (most recent first)."""
-    cur = conn.cursor()
+def get_producer_histories(cur, limit: int = HISTORY_WINDOW) -> dict[int, list[ProducerHistory]]:
+    """Get historical stats for every producer (most recent first), keyed by producer_id."""
     cur.execute("""
         SELECT 
+            s.producer_id,
             s.tick_id,
             s.consumer_count,
             s.market_share,
             s.avg_enticement,
             s.median_enticement,
-            string_agg(t.name, ',' ORDER BY t.name) as topping_names
-        FROM producer_round_stats s
+            array_agg(t.name ORDER BY t.name) as topping_names
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY producer_id ORDER BY tick_id DESC) AS rn
+            FROM producer_round_stats
+        ) s
         JOIN producer_offerings o ON s.tick_id = o.tick_id AND s.producer_id = o.producer_id
         JOIN producer_toppings pt ON s.tick_id = pt.tick_id AND s.producer_id = pt.producer_id
         JOIN toppings t ON pt.topping_id = t.id
-        WHERE s.producer_id = %s
-        GROUP BY s.tick_id, s.consumer_count, s.market_share, s.avg_enticement, s.median_enticement
-        ORDER BY s.tick_id DESC
-        LIMIT %s
-    """, (producer_id, limit))
+        WHERE s.rn <= %s
+        GROUP BY s.producer_id, s.tick_id, s.consumer_count, s.market_share, s.avg_enticement, s.median_enticement
+        ORDER BY s.producer_id, s.tick_id DESC
+    """, (limit,))
     rows = cur.fetchall()
-    cur.close()
     
-    return [
-        ProducerHistory(
-            tick_id=r[0],
-            consumer_count=r[1],
-            market_share=r[2],
-            avg_enticement=r[3],
-            median_enticement=r[4],
-            toppings=r[5].split(",") if r[5] else []
+    result: dict[int, list[ProducerHistory]] = {}
+    for r in rows:
+        result.setdefault(r[0], []).append(
+            ProducerHistory(*r[1:6], toppings=r[6] or [])
         )
-        for r in rows
-    ]
+    return result
 
-def get_toppings_used_last_tick(conn, tick_id: int) -> dict[int, list[int]]:
+def get_toppings_used_last_tick(cur, tick_id: int) -> dict[int, list[int]]:
     """Get mapping of producer_id -> topping_ids from a tick."""
-    cur = conn.cursor()
     cur.execute(
-        "SELECT producer_id, topping_id FROM producer_toppings WHERE tick_id = %s",
+        """SELECT producer_id, array_agg(topping_id ORDER BY topping_id)
+           FROM producer_toppings WHERE tick_id = %s
+           GROUP BY producer_id""",
         (tick_id,)
     )
     rows = cur.fetchall()
-    cur.close()
-    
-    result: dict[int, list[int]] = {}
-    for producer_id, topping_id in rows:
-        if producer_id not in result:
-            result[producer_id] = []
-        result[producer_id].append(topping_id)
-    return result
+    return dict(rows)
 
 # =============================================================================
 # Tick Management
 # =============================================================================
 
-def cleanup_incomplete_tick(conn) -> None:
-    """Remove any incomplete tick and its associated data."""
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM ticks WHERE completed_at IS NULL")
-    incomplete = cur.fetchone()
-    
-    if incomplete:
-        tick_id = incomplete[0]
-        print(f"🧹 Cleaning up incomplete tick {tick_id}...")
-        cur.execute("DELETE FROM producer_round_stats WHERE tick_id = %s", (tick_id,))
-        cur.execute("DELETE FROM consumer_choices WHERE tick_id = %s", (tick_id,))
-        cur.execute("DELETE FROM producer_toppings WHERE tick_id = %s", (tick_id,))
-        cur.execute("DELETE FROM producer_offerings WHERE tick_id = %s", (tick_id,))
-        cur.execute("DELETE FROM ticks WHERE id = %s", (tick_id,))
-        conn.commit()
-    cur.close()
+def cleanup_incomplete_tick(cur) -> None:
+    """Remove any incomplete tick left behind by older versions that committed mid-tick."""
+    # All deletes are pipelined to the server in one round trip and one
+    # transaction; the last statement reports which ticks were removed
+    with cur.connection.pipeline():
+        for table in ("producer_round_stats", "consumer_choices", "producer_toppings", "producer_offerings"):
+            cur.execute(f"DELETE FROM {table} WHERE tick_id IN (SELECT id FROM ticks WHERE completed_at IS NULL)")
+        cur.execute("DELETE FROM ticks WHERE completed_at IS NULL RETURNING id")
+        removed = [r[0] for r in cur.fetchall()]
+    
+    for tick_id in removed:
+        print(f"🧹 Cleaned up incomplete tick {tick_id}")
 
-def start_tick(conn) -> int:
-    """Start a new tick and return its ID."""
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO ticks (started_at) VALUES (%s) RETURNING id",
-        (datetime.now(),)
-    )
-    tick_id = cur.fetchone()[0]
-    conn.commit()
-    cur.close()
+def start_tick(cur) -> tuple[int, Optional[int], dict[int, list[int]]]:
+    """
+    Start a new tick in the same round trip that reads the previous state.
+    Returns the new tick ID, the most recent completed tick ID (None if no ticks
+    yet) and each producer's topping IDs from that completed tick.
+    """
+    # The CTEs share one snapshot, so the new (uncompleted) row is invisible to last
+    cur.execute("""
+        WITH new_tick AS (
+            INSERT INTO ticks (started_at) VALUES (%s) RETURNING id
+        ),
+        last AS (
+            SELECT MAX(id) AS tick_id FROM ticks WHERE completed_at IS NOT NULL
+        )
+        SELECT new_tick.id, last.tick_id, pt.producer_id, array_agg(pt.topping_id ORDER BY pt.topping_id)
+        FROM new_tick
+        CROSS JOIN last
+        LEFT JOIN producer_toppings pt ON pt.tick_id = last.tick_id
+        GROUP BY new_tick.id, last.tick_id, pt.producer_id
+    """, (datetime.now(),))
+    rows = cur.fetchall()
+    
+    tick_id, last_tick = rows[0][0], rows[0][1]
+    toppings = {producer_id: topping_ids for _, _, producer_id, topping_ids in rows if producer_id is not None}
     print(f"🎬 Started tick {tick_id}")
-    return tick_id
+    return tick_id, last_tick, toppings
 
-def complete_tick(conn, tick_id: int) -> None:
-    """Mark a tick as complete."""
-    cur = conn.cursor()
+def complete_tick(cur, tick_id: int) -> None:
+    """Mark a tick as complete and commit the tick's transaction."""
     cur.execute(
         "UPDATE ticks SET completed_at = %s WHERE id = %s",
         (datetime.now(), tick_id)
     )
-    conn.commit()
-    cur.close()
+    cur.connection.commit()
     print(f"✅ Completed tick {tick_id}")
 
 # =============================================================================
 # LLM Integration (Placeholders)
 # =============================================================================
 
+# Personality-driven guidance, keyed by trait value (1-5)
+RISK_GUIDANCE = {
+    1: "You prefer stability. Only swap 1 topping at most, even if struggling.",
+    2: "You prefer stability. Only swap 1 topping at most, even if struggling.",
+    3: "You make reasonable changes. Swap 1-2 toppings if performance is poor.",
+    4: "You LOVE making big changes. Swap 2-3 toppings when things aren't working!",
+    5: "You LOVE making big changes. Swap 2-3 toppings when things aren't working!",
+}
+
+CREATIVITY_GUIDANCE = {
+    1: "You prefer CLASSIC combinations - stick to traditional pancake toppings.",
+    2: "You prefer CLASSIC combinations - stick to traditional pancake toppings.",
+    3: "You balance classic and creative - some traditional, some unique.",
+    4: "You love UNUSUAL combinations - mix sweet and savory, try bold pairings!",
+    5: "You love UNUSUAL combinations - mix sweet and savory, try bold pairings!",
+}
+
+# Static instructions come first and byte-identical in every producer prompt so
+# Ollama can reuse the KV cache for them; per-producer details follow
+_PRODUCER_PROMPT_PREFIX = """You are a pancake producer competing for customers in a pancake market.
+
+🎯 GOAL: Get MORE CUSTOMERS than your competitors!
+
+TASK: Pick your ideal menu of 5 toppings from ALL AVAILABLE TOPPINGS below.
+- You may keep some from your current menu or swap them out
+- Use EXACT topping names from the list
+- ⚠️ List 7-10 toppings in order of preference! Competitors may take your top choices.
+- Your first 5 available toppings will become your menu
+
+RESPOND WITH JSON ONLY:
+{
+    "reasoning": "brief explanation of your strategy",
+    "desired_toppings": ["top_choice", "2nd", "3rd", "4th", "5th", "backup1", "backup2", "backup3"]
+}
+"""
+
 def build_producer_prompt(
     producer: Producer,
     current_toppings: list[str],
@@ -445,123 +536,81 @@ def build_producer_prompt(
             elif recent.market_share > 0.5:
                 urgent_warning = f"\n✅ GREAT: You dominated with {recent.market_share:.0%} market share. Your strategy is working!\n"
         
-        history_section = "\nYOUR RECENT PERFORMANCE:\n"
+        history_lines = ["\nYOUR RECENT PERFORMANCE:\n"]
         for h in history[:5]:
             status = "💀" if h.market_share == 0 else "⚠️" if h.market_share < 0.2 else "✅" if h.market_share > 0.4 else "😐"
-            history_section += f"{status} Tick {h.tick_id}: {h.consumer_count} customers ({h.market_share:.0%} share), toppings: {', '.join(h.toppings)}\n"
+            history_lines.append(f"{status} Tick {h.tick_id}: {h.consumer_count} customers ({h.market_share:.0%} share), toppings: {', '.join(h.toppings)}\n")
+        history_section = "".join(history_lines)
     else:
         history_section = "\nThis is your FIRST ROUND - pick an interesting starting menu!\n"
     
     # Personality-driven guidance
-    if producer.risk_tolerance >= 4:
-        risk_guidance = "You LOVE making big changes. Swap 2-3 toppings when things aren't working!"
-    elif producer.risk_tolerance <= 2:
-        risk_guidance = "You prefer stability. Only swap 1 topping at most, even if struggling."
-    else:
-        risk_guidance = "You make reasonable changes. Swap 1-2 toppings if performance is poor."
-    
-    if producer.creativity_bias >= 4:
-        creativity_guidance = "You love UNUSUAL combinations - mix sweet and savory, try bold pairings!"
-    elif producer.creativity_bias <= 2:
-        creativity_guidance = "You prefer CLASSIC combinations - stick to traditional pancake toppings."
-    else:
-        creativity_guidance = "You balance classic and creative - some traditional, some unique."
+    risk_guidance = RISK_GUIDANCE[producer.risk_tolerance]
+    creativity_guidance = CREATIVITY_GUIDANCE[producer.creativity_bias]
 
     topping_list = ", ".join(all_toppings)
     current_menu = ', '.join(current_toppings) if current_toppings else '(none yet)'
     
-    prompt = f"""You are {producer.name}, competing for customers in a pancake market.
+    # The catalogue is shared by all producers in a tick, so it extends the
+    # cached prefix; everything after it is specific to this producer
+    return _PRODUCER_PROMPT_PREFIX + f"""
+ALL AVAILABLE TOPPINGS: {topping_list}
 
-🎯 GOAL: Get MORE CUSTOMERS than your competitors!
+You are {producer.name}.
 {urgent_warning}
 YOUR PERSONALITY:
 - {risk_guidance}
 - {creativity_guidance}
 
 YOUR CURRENT MENU: {current_menu}
-{history_section}
-ALL AVAILABLE TOPPINGS: {topping_list}
+{history_section}"""
 
-TASK: Pick your ideal menu of 5 toppings from the list above.
-- You may keep some from your current menu or swap them out
-- Use EXACT topping names from the list
-- ⚠️ List 7-10 toppings in order of preference! Competitors may take your top choices.
-- Your first 5 available toppings will become your menu
+# Consumer trait descriptions, keyed by trait value (1-5)
+OPENNESS_DESCRIPTIONS = {
+    1: "You HATE weird ingredients. Matcha? Lavender? Cardamom? Passion fruit? DISGUSTING. These make you feel physically ill. You want NORMAL pancake toppings ONLY - blueberry, maple syrup, chocolate chip, strawberry. Anything exotic or unfamiliar is an absolute dealbreaker.",
+    2: "You strongly prefer familiar ingredients. Exotic toppings like matcha, lavender, or cardamom make you uncomfortable and would ruin the meal.",
+    3: "You're open to both traditional and moderately creative options, though very unusual ingredients give you pause.",
+    4: "You enjoy trying interesting combinations. A few exotic ingredients actually make the meal more exciting!",
+    5: "You're BORED by basic toppings. Blueberry? Maple syrup? How pedestrian. You CRAVE adventure - matcha, lavender honey, passion fruit, cardamom! The weirder and more unusual, the better. Classic pancakes are a waste of your time."
+}
 
-RESPOND WITH JSON ONLY:
-{{
-    "reasoning": "brief explanation of your strategy",
-    "desired_toppings": ["top_choice", "2nd", "3rd", "4th", "5th", "backup1", "backup2", "backup3"]
-}}
-"""
-    return prompt
+PICKINESS_DESCRIPTIONS = {
+    1: "You're extremely easy to please - honestly, almost anything sounds delicious to you! You'll happily eat whatever.",
+    2: "You're fairly easy-going. Most reasonable options work for you.",
+    3: "You have moderate standards. You notice quality but aren't too demanding.",
+    4: "You're quite particular. Bad ingredient combinations genuinely bother you. Mismatched flavors are a real turnoff.",
+    5: "You're EXTREMELY picky and hard to impress. Most options look mediocre at best. You have refined taste and can immediately spot lazy or clashing combinations. Your enticement score is almost never above 7 unless an option is truly exceptional."
+}
 
-def build_consumer_prompt(
-    consumer: Consumer,
-    offerings: dict[str, dict]  # producer_name -> {toppings: [...], label: "A"}
-) -> str:
-    """Build the prompt for a consumer's choice."""
-    
-    # Build personality description from traits
-    openness_desc = {
-        1: "You HATE weird ingredients. Matcha? Lavender? Cardamom? Passion fruit? DISGUSTING. These make you feel physically ill. You want NORMAL pancake toppings ONLY - blueberry, maple syrup, chocolate chip, strawberry. Anything exotic or unfamiliar is an absolute dealbreaker.",
-        2: "You strongly prefer familiar ingredients. Exotic toppings like matcha, lavender, or cardamom make you uncomfortable and would ruin the meal.",
-        3: "You're open to both traditional and moderately creative options, though very unusual ingredients give you pause.",
-        4: "You enjoy trying interesting combinations. A few exotic ingredients actually make the meal more exciting!",
-        5: "You're BORED by basic toppings. Blueberry? Maple syrup? How pedestrian. You CRAVE adventure - matcha, lavender honey, passion fruit, cardamom! The weirder and more unusual, the better. Classic pancakes are a waste of your time."
-    }
-    
-    pickiness_desc = {
-        1: "You're extremely easy to please - honestly, almost anything sounds delicious to you! You'll happily eat whatever.",
-        2: "You're fairly easy-going. Most reasonable options work for you.",
-        3: "You have moderate standards. You notice quality but aren't too demanding.",
-        4: "You're quite particular. Bad ingredient combinations genuinely bother you. Mismatched flavors are a real turnoff.",
-        5: "You're EXTREMELY picky and hard to impress. Most options look mediocre at best. You have refined taste and can immediately spot lazy or clashing combinations. Your enticement score is almost never above 7 unless an option is truly exceptional."
-    }
-    
-    impulsivity_desc = {
-        1: "You methodically analyze every topping in every option, weighing pros and cons carefully before deciding.",
-        2: "You take your time, thoughtfully considering each option.",
-        3: "You balance gut feeling with consideration.",
-        4: "You tend to go with your first instinct - whichever option catches your eye.",
-        5: "You decide INSTANTLY based on whatever single topping jumps out first! You don't overthink it - one appealing ingredient and you're sold."
-    }
-    
-    indulgence_desc = {
-        1: "You prefer LIGHT, simple options. Rich, heavy toppings like chocolate, caramel, nutella, and whipped cream are way too much - they'd make you feel sick. Fresh fruit is more your style.",
-        2: "You lean toward lighter fare. Too much richness is off-putting.",
-        3: "You enjoy both light and rich options equally.",
-        4: "You're definitely drawn to richer, more decadent choices. Chocolate, caramel, cream - yes please!",
-        5: "You CRAVE maximum indulgence! Chocolate chip, nutella, caramel, whipped cream, candied pecans - load it up! The richer and more decadent, the better. Light, fruity options are boring and unsatisfying."
-    }
-    
-    nostalgia_desc = {
-        1: "You couldn't care less about 'classic' - those boring traditional pancakes your grandma made? Yawn. You want something MODERN and fresh, not the same old maple syrup and blueberries.",
-        2: "Traditional options don't particularly appeal to you. You'd rather try something different.",
-        3: "You appreciate both classic and modern options equally.",
-        4: "You're drawn to comforting, familiar flavors - the kind of pancakes you grew up with.",
-        5: "You LOVE nostalgic, homestyle flavors! Maple syrup, blueberry, strawberry, banana, bacon, honey - these remind you of happy childhood mornings and make your heart sing. Modern fusion ingredients feel wrong on a pancake."
-    }
-    
-    prompt = f"""You are Consumer #{consumer.id}, choosing where to get pancakes.
+IMPULSIVITY_DESCRIPTIONS = {
+    1: "You methodically analyze every topping in every option, weighing pros and cons carefully before deciding.",
+    2: "You take your time, thoughtfully considering each option.",
+    3: "You balance gut feeling with consideration.",
+    4: "You tend to go with your first instinct - whichever option catches your eye.",
+    5: "You decide INSTANTLY based on whatever single topping jumps out first! You don't overthink it - one appealing ingredient and you're sold."
+}
 
-YOUR PERSONALITY:
-- Openness ({consumer.openness}/5): {openness_desc[consumer.openness]}
-- Pickiness ({consumer.pickiness}/5): {pickiness_desc[consumer.pickiness]}
-- Impulsivity ({consumer.impulsivity}/5): {impulsivity_desc[consumer.impulsivity]}
-- Indulgence ({consumer.indulgence}/5): {indulgence_desc[consumer.indulgence]}
-- Nostalgia ({consumer.nostalgia}/5): {nostalgia_desc[consumer.nostalgia]}
+INDULGENCE_DESCRIPTIONS = {
+    1: "You prefer LIGHT, simple options. Rich, heavy toppings like chocolate, caramel, nutella, and whipped cream are way too much - they'd make you feel sick. Fresh fruit is more your style.",
+    2: "You lean toward lighter fare. Too much richness is off-putting.",
+    3: "You enjoy both light and rich options equally.",
+    4: "You're definitely drawn to richer, more decadent choices. Chocolate, caramel, cream - yes please!",
+    5: "You CRAVE maximum indulgence! Chocolate chip, nutella, caramel, whipped cream, candied pecans - load it up! The richer and more decadent, the better. Light, fruity options are boring and unsatisfying."
+}
 
-TODAY'S PANCAKE OPTIONS:
-"""
-    # Show offerings with abstract labels (A, B, C) - no brand names
-    for producer_name, offering in offerings.items():
-        label = offering['label']
-        prompt += f"\nOption {label}:\n"
-        prompt += f"  - Toppings: {', '.join(offering['toppings'])}\n"
+NOSTALGIA_DESCRIPTIONS = {
+    1: "You couldn't care less about 'classic' - those boring traditional pancakes your grandma made? Yawn. You want something MODERN and fresh, not the same old maple syrup and blueberries.",
+    2: "Traditional options don't particularly appeal to you. You'd rather try something different.",
+    3: "You appreciate both classic and modern options equally.",
+    4: "You're drawn to comforting, familiar flavors - the kind of pancakes you grew up with.",
+    5: "You LOVE nostalgic, homestyle flavors! Maple syrup, blueberry, strawberry, banana, bacon, honey - these remind you of happy childhood mornings and make your heart sing. Modern fusion ingredients feel wrong on a pancake."
+}
+
+# Static rubric and answer format, byte-identical in every consumer prompt so
+# Ollama can reuse the KV cache for them; the consumer and options follow
+_CONSUMER_PROMPT_PREFIX = """You are a consumer choosing where to get pancakes. Your personality and today's options are described below.
 
-    prompt += """
-Which option appeals to you most based on the toppings?
+Pick the option whose toppings appeal to you most.
 Respond with the option NUMBER (1, 2, or 3).
 
 ENTICEMENT SCORING (be true to your pickiness level!):
@@ -578,52 +627,69 @@ RESPOND WITH JSON ONLY:
     "enticement_score": <1-10>
 }
 """
-    return prompt
+
+def build_consumer_prompt(
+    consumer: Consumer,
+    offerings: dict[str, dict]  # producer_name -> {toppings: [...], label: "A"}
+) -> str:
+    """Build the prompt for a consumer's choice."""
+    parts = [_CONSUMER_PROMPT_PREFIX, f"""
+You are Consumer #{consumer.id}.
+
+YOUR PERSONALITY:
+- Openness ({consumer.openness}/5): {OPENNESS_DESCRIPTIONS[consumer.openness]}
+- Pickiness ({consumer.pickiness}/5): {PICKINESS_DESCRIPTIONS[consumer.pickiness]}
+- Impulsivity ({consumer.impulsivity}/5): {IMPULSIVITY_DESCRIPTIONS[consumer.impulsivity]}
+- Indulgence ({consumer.indulgence}/5): {INDULGENCE_DESCRIPTIONS[consumer.indulgence]}
+- Nostalgia ({consumer.nostalgia}/5): {NOSTALGIA_DESCRIPTIONS[consumer.nostalgia]}
+
+TODAY'S PANCAKE OPTIONS:
+"""]
+    # Show offerings with abstract labels (A, B, C) - no brand names
+    for producer_name, offering in offerings.items():
+        label = offering['label']
+        parts.append(f"\nOption {label}:\n")
+        parts.append(f"  - Toppings: {', '.join(offering['toppings'])}\n")
+    return "".join(parts)
+
+# First "{" through last "}" - a code fence or prose around the object falls
+# outside this span
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
 
 def call_llm(prompt: str) -> dict:
     """
     Call Ollama and parse JSON response.
     """
-    url = f"{OLLAMA_BASE_URL}/api/generate"
     payload = {
         "model": OLLAMA_MODEL,
         "prompt": prompt,
         "stream": False,  # Get complete response at once
+        "format": "json",  # Constrain decoding to a bare JSON object - no fences or prose
     }
     
     try:
-        data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+        data = orjson.dumps(payload)  # already bytes
+        result = orjson.loads(ollama_request("POST", "/api/generate", data))
+        response_text = result.get("response", "")
         
-        with urllib.request.urlopen(req, timeout=60) as response:
-            result = json.loads(response.read().decode("utf-8"))
-            response_text = result.get("response", "")
-            
-            # Print raw response for debugging
-            print(f"    📝 Raw LLM response:")
-            print(f"    {'-'*40}")
-            for line in response_text.strip().split('\n'):
-                print(f"    {line}")
-            print(f"    {'-'*40}")
-            
-            # Try to extract JSON from the response
-            # LLMs sometimes wrap JSON in markdown code blocks
-            json_text = response_text
-            if "```json" in json_text:
-                json_text = json_text.split("```json")[1].split("```")[0]
-            elif "```" in json_text:
-                json_text = json_text.split("```")[1].split("```")[0]
-            
-            # Try to find JSON object in the text
-            start_idx = json_text.find("{")
-            end_idx = json_text.rfind("}") + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_text = json_text[start_idx:end_idx]
-            
-            parsed = json.loads(json_text)
-            return parsed
-            
-    except json.JSONDecodeError as e:
+        # Print raw response for debugging - one write, so concurrent calls don't interleave
+        if LLM_DEBUG:
+            divider = f"    {'-'*40}"
+            body = "\n".join(f"    {line}" for line in response_text.strip().split('\n'))
+            print(f"    📝 Raw LLM response:\n{divider}\n{body}\n{divider}")
+        
+        # With format=json the response is the object itself; only fall back to
+        # the outermost {...} span if the model still wrapped it in fences or prose
+        json_text = response_text
+        if not json_text.lstrip().startswith("{"):
+            match = _JSON_OBJECT_RE.search(json_text)
+            if match:
+                json_text = match.group(0)
+        
+        parsed = orjson.loads(json_text)
+        return parsed
+        
+    except orjson.JSONDecodeError as e:
         print(f"    ⚠️ Failed to parse LLM JSON response: {e}")
         return {}
     except Exception as e:
@@ -653,10 +719,12 @@ def producer_llm_decide(
     if response and response.get("desired_toppings"):
         # Normalize to lowercase and map back to actual names
         desired = []
+        seen = set()
         for t in response.get("desired_toppings", []):
             actual = topping_lower_to_actual.get(t.lower())
-            if actual and actual not in desired:
+            if actual and actual not in seen:
                 desired.append(actual)
+                seen.add(actual)
         
         # Compute keep vs wanted from the desired list
         # Keep = toppings that are both in current menu AND in desired list
@@ -679,7 +747,8 @@ def producer_llm_decide(
         # Random mock behavior based on traits
         num_swaps = min(MAX_TOPPING_SWAPS, random.randint(0, producer.risk_tolerance))
         keep = current_toppings[:(NUM_TOPPINGS_PER_PRODUCER - num_swaps)] if current_toppings else []
-        available = [t for t in all_toppings if t not in keep]
+        keep_set = set(keep)
+        available = [t for t in all_toppings if t not in keep_set]
         # Request more than needed to handle conflicts - ask for up to 9 (3 producers * 3 max swaps)
         num_wanted = min(len(available), (NUM_TOPPINGS_PER_PRODUCER - len(keep)) + 6)
         wanted = random.sample(available, num_wanted)
@@ -727,7 +796,7 @@ def consumer_llm_choose(consumer: Consumer, offerings: dict[str, dict], label_to
 def resolve_topping_conflicts(
     producer_decisions: list[tuple[Producer, dict]],
     tick_id: int,
-    all_toppings: list[Topping]
+    lookups: LookupTables
 ) -> list[ProducerOffering]:
     """
     Resolve topping conflicts using rotating priority.
@@ -742,62 +811,82 @@ def resolve_topping_conflicts(
     
     print(f"  🎯 Topping allocation priority this tick: {[producer_decisions[i][0].name for i in priority_order]}")
     
-    topping_name_to_id = {t.name: t.id for t in all_toppings}
-    claimed_toppings: set[str] = set()
+    topping_name_to_id = lookups.topping_name_to_id
     offerings: list[ProducerOffering] = []
     
+    # Claimed toppings are tracked as an int bitmask (bit = topping ID), so
+    # "is it taken?" is a single AND instead of a set lookup
+    topping_bit = {name: 1 << tid for name, tid in topping_name_to_id.items()}
+    claimed_mask = 0
+    
     # First pass: lock in kept toppings (these are guaranteed)
     producer_kept: dict[int, list[str]] = {}  # producer_id -> kept topping names
     for producer, decision in producer_decisions:
         kept = decision.get("keep_toppings", [])
         producer_kept[producer.id] = kept
-        claimed_toppings.update(kept)
+        for name in kept:
+            claimed_mask |= topping_bit.get(name, 0)
+    
+    # Wanted toppings as (name, bit) in preference order, invalid names dropped up front
+    wanted_bits = [
+        [(name, topping_bit[name]) for name in decision.get("wanted_toppings", []) if name in topping_bit]
+        for _, decision in producer_decisions
+    ]
     
     # Second pass: allocate wanted toppings by priority
     producer_final_toppings: dict[int, list[str]] = {p.id: list(producer_kept[p.id]) for p, _ in producer_decisions}
     
-    # Round-robin allocation of wanted toppings
+    # Round-robin allocation of wanted toppings. Claims are never released, so
+    # each producer keeps a cursor into its wanted list and a later round resumes
+    # where the previous one stopped instead of rescanning taken toppings
+    wanted_pos = [0] * num_producers
     max_rounds = NUM_TOPPINGS_PER_PRODUCER  # Safety limit
     for round_num in range(max_rounds):
         made_progress = False
         for idx in priority_order:
-            producer, decision = producer_decisions[idx]
+            producer = producer_decisions[idx][0]
             current = producer_final_toppings[producer.id]
             
             if len(current) >= NUM_TOPPINGS_PER_PRODUCER:
                 continue  # Already full
             
-            wanted = decision.get("wanted_toppings", [])
-            for topping_name in wanted:
-                if topping_name in claimed_toppings:
+            wanted = wanted_bits[idx]
+            pos = wanted_pos[idx]
+            while pos < len(wanted):
+                topping_name, bit = wanted[pos]
+                pos += 1
+                if claimed_mask & bit:
                     continue  # Already claimed
-                if topping_name not in topping_name_to_id:
-                    continue  # Invalid topping
                 
                 # Claim it!
                 current.append(topping_name)
-                claimed_toppings.add(topping_name)
+                claimed_mask |= bit
                 made_progress = True
                 break  # One topping per round per producer
+            wanted_pos[idx] = pos
         
         if not made_progress:
             break
     
-    # Fill any gaps with random unclaimed toppings
-    all_topping_names = [t.name for t in all_toppings]
-    for producer, decision in producer_decisions:
+    # Fill any gaps with random unclaimed toppings - the unclaimed pool is built
+    # once (in catalogue order, so seeded runs stay reproducible) and each
+    # producer samples all of its fillers at once
+    unclaimed = [name for name, bit in topping_bit.items() if not claimed_mask & bit]
+    for producer, _ in producer_decisions:
         current = producer_final_toppings[producer.id]
-        while len(current) < NUM_TOPPINGS_PER_PRODUCER:
-            available = [t for t in all_topping_names if t not in claimed_toppings]
-            if not available:
-                print(f"  ⚠️ Warning: Not enough toppings for {producer.name}!")
-                break
-            filler = random.choice(available)
-            current.append(filler)
-            claimed_toppings.add(filler)
+        needed = NUM_TOPPINGS_PER_PRODUCER - len(current)
+        if needed <= 0:
+            continue
+        if needed > len(unclaimed):
+            print(f"  ⚠️ Warning: Not enough toppings for {producer.name}!")
+        fillers = random.sample(unclaimed, min(needed, len(unclaimed)))
+        current.extend(fillers)
+        for name in fillers:
+            claimed_mask |= topping_bit[name]
+        unclaimed = [name for name in unclaimed if not claimed_mask & topping_bit[name]]
     
     # Build offerings
-    for producer, decision in producer_decisions:
+    for producer, _ in producer_decisions:
         topping_ids = [topping_name_to_id[name] for name in producer_final_toppings[producer.id]]
         offerings.append(ProducerOffering(
             producer_id=producer.id,
@@ -811,71 +900,51 @@ def resolve_topping_conflicts(
 # Persistence
 # =============================================================================
 
-def persist_offerings(conn, tick_id: int, offerings: list[ProducerOffering]) -> None:
-    """Persist producer offerings for this tick."""
-    cur = conn.cursor()
-    for offering in offerings:
-        cur.execute(
+def persist_offerings(cur, tick_id: int, offerings: list[ProducerOffering]) -> None:
+    """Persist producer offerings for this tick (both tables in one pipelined round trip)."""
+    with cur.connection.pipeline():
+        cur.executemany(
             "INSERT INTO producer_offerings (tick_id, producer_id) VALUES (%s, %s)",
-            (tick_id, offering.producer_id)
+            [(tick_id, offering.producer_id) for offering in offerings]
+        )
+        cur.executemany(
+            "INSERT INTO producer_toppings (tick_id, producer_id, topping_id) VALUES (%s, %s, %s)",
+            [(tick_id, offering.producer_id, topping_id) for offering in offerings for topping_id in offering.topping_ids]
         )
-        for topping_id in offering.topping_ids:
-            cur.execute(
-                "INSERT INTO producer_toppings (tick_id, producer_id, topping_id) VALUES (%s, %s, %s)",
-                (tick_id, offering.producer_id, topping_id)
-            )
-    conn.commit()
-    cur.close()
 
-def persist_choice(conn, tick_id: int, consumer_id: int, producer_id: int, enticement_score: int) -> None:
-    """Persist a consumer's choice."""
-    cur = conn.cursor()
-    cur.execute(
+def persist_choices(cur, tick_id: int, choices: list[ConsumerChoice]) -> None:
+    """Persist all consumers' choices for this tick (executemany pipelines the rows)."""
+    cur.executemany(
         "INSERT INTO consumer_choices (tick_id, consumer_id, producer_id, enticement_score) VALUES (%s, %s, %s, %s)",
-        (tick_id, consumer_id, producer_id, enticement_score)
+        [(tick_id, c.consumer_id, c.producer_id, c.enticement_score) for c in choices]
     )
-    conn.commit()
-    cur.close()
 
-def compute_and_persist_stats(conn, tick_id: int, producers: list[Producer]) -> None:
+def compute_and_persist_stats(cur, tick_id: int, producers: list[Producer]) -> None:
     """Compute and persist round statistics for each producer."""
-    cur = conn.cursor()
-    
-    cur.execute("SELECT COUNT(*) FROM consumer_choices WHERE tick_id = %s", (tick_id,))
-    total_consumers = cur.fetchone()[0]
+    # Aggregate in PostgreSQL and insert in one statement; the LEFT JOIN keeps
+    # producers nobody picked (zero customers, zero scores)
+    cur.execute(
+        """INSERT INTO producer_round_stats 
+           (tick_id, producer_id, consumer_count, market_share, avg_enticement, median_enticement)
+           SELECT
+               %(tick_id)s,
+               p.id,
+               COUNT(c.consumer_id),
+               COALESCE(COUNT(c.consumer_id)::REAL / NULLIF(SUM(COUNT(c.consumer_id)) OVER (), 0), 0),
+               COALESCE(AVG(c.enticement_score), 0),
+               COALESCE(percentile_cont(0.5) WITHIN GROUP (ORDER BY c.enticement_score), 0)
+           FROM producers p
+           LEFT JOIN consumer_choices c ON c.producer_id = p.id AND c.tick_id = %(tick_id)s
+           WHERE p.id = ANY(%(producer_ids)s)
+           GROUP BY p.id
+           RETURNING producer_id, consumer_count, market_share, avg_enticement""",
+        {"tick_id": tick_id, "producer_ids": [p.id for p in producers]}
+    )
+    stats = {r[0]: r[1:] for r in cur.fetchall()}
     
     for producer in producers:
-        # Get consumer count and enticement scores
-        cur.execute(
-            "SELECT enticement_score FROM consumer_choices WHERE tick_id = %s AND producer_id = %s",
-            (tick_id, producer.id)
-        )
-        rows = cur.fetchall()
-        
-        consumer_count = len(rows)
-        market_share = consumer_count / total_consumers if total_consumers > 0 else 0
-        
-        if rows:
-            scores = [r[0] for r in rows]
-            avg_enticement = sum(scores) / len(scores)
-            sorted_scores = sorted(scores)
-            mid = len(sorted_scores) // 2
-            median_enticement = (sorted_scores[mid] + sorted_scores[~mid]) / 2
-        else:
-            avg_enticement = 0
-            median_enticement = 0
-        
-        cur.execute(
-            """INSERT INTO producer_round_stats 
-               (tick_id, producer_id, consumer_count, market_share, avg_enticement, median_enticement)
-               VALUES (%s, %s, %s, %s, %s, %s)""",
-            (tick_id, producer.id, consumer_count, market_share, avg_enticement, median_enticement)
-        )
-        
+        consumer_count, market_share, avg_enticement = stats[producer.id]
         print(f"  📊 {producer.name}: {consumer_count} customers ({market_share:.1%}), avg enticement {avg_enticement:.1f}")
-    
-    conn.commit()
-    cur.close()
 
 # =============================================================================
 # Main Tick Loop
@@ -883,17 +952,19 @@ def compute_and_persist_stats(conn, tick_id: int, producers: list[Producer]) ->
 
 def initialize_first_tick_offerings(
     producers: list[Producer],
-    all_toppings: list[Topping]
+    topping_id_to_name: dict[int, str]
 ) -> list[ProducerOffering]:
     """
     Initialize offerings for first tick with random exclusive toppings.
-    Shuffle all toppings and deal 5 to each producer.
+    Draw just enough random toppings and deal 5 to each producer.
     """
     print("  🎲 Shuffling and dealing toppings...")
     
-    # Shuffle topping IDs
-    topping_ids = [t.id for t in all_toppings]
-    random.shuffle(topping_ids)
+    # Draw only the IDs we deal out rather than shuffling the whole pool
+    all_topping_ids = list(topping_id_to_name)
+    topping_ids = random.sample(
+        all_topping_ids, min(len(all_topping_ids), len(producers) * NUM_TOPPINGS_PER_PRODUCER)
+    )
     
     offerings = []
     for i, producer in enumerate(producers):
@@ -901,7 +972,7 @@ def initialize_first_tick_offerings(
         start_idx = i * NUM_TOPPINGS_PER_PRODUCER
         producer_topping_ids = topping_ids[start_idx:start_idx + NUM_TOPPINGS_PER_PRODUCER]
         
-        topping_names = [t.name for t in all_toppings if t.id in producer_topping_ids]
+        topping_names = [topping_id_to_name[tid] for tid in producer_topping_ids]
         print(f"  📦 {producer.name}: {topping_names}")
         
         offerings.append(ProducerOffering(
@@ -916,126 +987,159 @@ def run_tick(conn) -> None:
     """Run a single tick of the simulation."""
     tick_start_time = time.time()
     
-    # 1. Cleanup incomplete tick if exists
-    cleanup_incomplete_tick(conn)
-    
-    # 2. Start new tick
-    tick_id = start_tick(conn)
-    
-    # 3. Load entities
-    producers = get_producers(conn)
-    consumers = get_consumers(conn)
-    all_toppings = get_all_toppings(conn)
-    all_topping_names = [t.name for t in all_toppings]
-    topping_id_to_name = {t.id: t.name for t in all_toppings}
-    
-    # 4. Determine if this is the first tick
-    last_tick = get_latest_completed_tick(conn)
-    is_first_tick = last_tick is None
-    
-    # 5. Handle producer phase differently for first tick vs subsequent ticks
-    if is_first_tick:
-        # First tick: random initialization, no LLM decisions
-        print("\n🎰 Phase 1: Random Initialization (First Tick)")
-        print("  Producers get random toppings - no decisions yet.")
-        offerings = initialize_first_tick_offerings(producers, all_toppings)
-    else:
-        # Subsequent ticks: LLM-powered producer decisions
-        print("\n📝 Phase 1: Producer Decisions")
-        producer_decisions: list[tuple[Producer, dict]] = []
+    # Everything below runs in one transaction that complete_tick commits; a
+    # failure or crash mid-tick leaves nothing behind. One cursor serves every
+    # query in the tick
+    cur = conn.cursor()
+    try:
+        # 1. Cleanup incomplete tick if exists
+        cleanup_incomplete_tick(cur)
         
-        for producer in producers:
-            current_topping_ids = get_producer_current_toppings(conn, producer.id, last_tick)
-            current_topping_names = [topping_id_to_name[tid] for tid in current_topping_ids]
-            history = get_producer_history(conn, producer.id)
+        # 2. Start new tick (also fetches the last completed tick and its menus)
+        tick_id, last_tick, current_toppings_by_producer = start_tick(cur)
+        
+        # 3. Load entities
+        producers = get_producers(cur)
+        consumers = get_consumers(cur)
+        all_toppings = get_all_toppings(cur)
+        all_topping_names = [t.name for t in all_toppings]
+        lookups = LookupTables.build(producers, all_toppings)
+        topping_id_to_name = lookups.topping_id_to_name
+        
+        # 4. Determine if this is the first tick
+        is_first_tick = last_tick is None
+        
+        # 5. Handle producer phase differently for first tick vs subsequent ticks
+        if is_first_tick:
+            # First tick: random initialization, no LLM decisions
+            print("\n🎰 Phase 1: Random Initialization (First Tick)")
+            print("  Producers get random toppings - no decisions yet.")
+            offerings = initialize_first_tick_offerings(producers, topping_id_to_name)
+        else:
+            # Subsequent ticks: LLM-powered producer decisions
+            print("\n📝 Phase 1: Producer Decisions")
+            producer_decisions: list[tuple[Producer, dict]] = []
+        
+            # Current menus came with the last tick; history is one more query (DB
+            # access stays on this thread), then ask all producers at once
+            histories = get_producer_histories(cur)
+        
+            with ThreadPoolExecutor(max_workers=max(min(len(producers), LLM_MAX_WORKERS), 1)) as executor:
+                futures = []
+                for producer in producers:
+                    current_topping_ids = current_toppings_by_producer.get(producer.id, [])
+                    current_topping_names = [topping_id_to_name[tid] for tid in current_topping_ids]
+                    history = histories.get(producer.id, [])
+                
+                    futures.append(executor.submit(
+                        producer_llm_decide,
+                        producer,
+                        current_topping_names,
+                        all_topping_names,
+                        history,
+                        is_first_tick=False
+                    ))
             
-            decision = producer_llm_decide(
-                producer,
-                current_topping_names,
-                all_topping_names,
-                history,
-                is_first_tick=False
-            )
-            producer_decisions.append((producer, decision))
+                # Collect in producer order - allocation priority is index-based
+                for producer, future in zip(producers, futures):
+                    producer_decisions.append((producer, future.result()))
         
-        # Show what each producer requested
-        print("\n📋 Producer Requests (before allocation):")
-        for producer, decision in producer_decisions:
-            keep = decision.get("keep_toppings", [])
-            want = decision.get("wanted_toppings", [])
-            print(f"  {producer.name}: keep {keep} + want {want}")
+            # Show what each producer requested
+            print("\n📋 Producer Requests (before allocation):")
+            for producer, decision in producer_decisions:
+                keep = decision.get("keep_toppings", [])
+                want = decision.get("wanted_toppings", [])
+                print(f"  {producer.name}: keep {keep} + want {want}")
         
-        # Resolve topping conflicts
-        print("\n🎲 Phase 2: Topping Allocation")
-        offerings = resolve_topping_conflicts(producer_decisions, tick_id, all_toppings)
-    
-    # 7. Persist producer offerings
-    persist_offerings(conn, tick_id, offerings)
-    
-    # 8. Build offerings dict for consumers with abstract labels
-    producer_id_to_name = {p.id: p.name for p in producers}
-    offerings_for_consumers: dict[str, dict] = {}
-    label_to_producer: dict[str, str] = {}  # "A" -> "Fluffy's Pancake Palace"
-    labels = ["A", "B", "C", "D", "E"]  # Support up to 5 producers
-    
-    for i, offering in enumerate(offerings):
-        producer_name = producer_id_to_name[offering.producer_id]
-        topping_names = [topping_id_to_name[tid] for tid in offering.topping_ids]
-        label = labels[i]
-        offerings_for_consumers[producer_name] = {
-            "toppings": topping_names,
-            "label": label
-        }
-        label_to_producer[label] = producer_name
-    
-    # 9. Consumer decisions
-    print("\n🍽️ Phase 3: Consumer Choices")
-    producer_name_to_id = {p.name: p.id for p in producers}
-    
-    for consumer in consumers:
-        # Randomize option order for each consumer to avoid position bias
-        producer_names = list(offerings_for_consumers.keys())
-        random.shuffle(producer_names)
+            # Resolve topping conflicts
+            print("\n🎲 Phase 2: Topping Allocation")
+            offerings = resolve_topping_conflicts(producer_decisions, tick_id, lookups)
         
-        # Use simple numbers but randomized order
-        number_labels = ["1", "2", "3"]
+        # 7. Persist producer offerings
+        persist_offerings(cur, tick_id, offerings)
         
-        # Build shuffled offerings with number labels
-        shuffled_offerings: dict[str, dict] = {}
-        consumer_label_to_producer: dict[str, str] = {}
-        debug_mapping = []
-        for i, producer_name in enumerate(producer_names):
-            label = number_labels[i]
-            shuffled_offerings[producer_name] = {
-                "toppings": offerings_for_consumers[producer_name]["toppings"],
+        # 8. Build offerings dict for consumers with abstract labels
+        producer_id_to_name = lookups.producer_id_to_name
+        offerings_for_consumers: dict[str, dict] = {}
+        label_to_producer: dict[str, str] = {}  # "A" -> "Fluffy's Pancake Palace"
+        labels = ["A", "B", "C", "D", "E"]  # Support up to 5 producers
+        
+        for i, offering in enumerate(offerings):
+            producer_name = producer_id_to_name[offering.producer_id]
+            topping_names = [topping_id_to_name[tid] for tid in offering.topping_ids]
+            label = labels[i]
+            offerings_for_consumers[producer_name] = {
+                "toppings": topping_names,
                 "label": label
             }
-            consumer_label_to_producer[label] = producer_name
-            # Abbreviate producer name for debug
-            short_name = producer_name.split("'")[0] if "'" in producer_name else producer_name[:8]
-            debug_mapping.append(f"{label}={short_name}")
+            label_to_producer[label] = producer_name
         
-        choice = consumer_llm_choose(consumer, shuffled_offerings, consumer_label_to_producer, debug_mapping)
-        chosen_name = choice.get("chosen_producer", "")
-        chosen_id = producer_name_to_id.get(chosen_name)
+        # 9. Consumer decisions
+        print("\n🍽️ Phase 3: Consumer Choices")
+        producer_name_to_id = lookups.producer_name_to_id
         
-        if chosen_id is None:
-            # Fallback: random choice
-            chosen_id = random.choice(producers).id
-            print(f"  ⚠️ Consumer #{consumer.id} made invalid choice, randomly assigned")
+        # Every consumer sees the same menus, only in a different order, so build
+        # each possible ordering once (3! = 6) and hand each consumer one at random
+        # to avoid position bias. The views are read-only once built.
+        number_labels = ["1", "2", "3"]  # Use simple numbers but randomized order
+        consumer_views = []
+        for producer_names in itertools.permutations(offerings_for_consumers):
+            # Build shuffled offerings with number labels
+            shuffled_offerings: dict[str, dict] = {}
+            consumer_label_to_producer: dict[str, str] = {}
+            debug_mapping = []
+            for i, producer_name in enumerate(producer_names):
+                label = number_labels[i]
+                shuffled_offerings[producer_name] = {
+                    "toppings": offerings_for_consumers[producer_name]["toppings"],
+                    "label": label
+                }
+                consumer_label_to_producer[label] = producer_name
+                # Abbreviate producer name for debug
+                short_name = producer_name.split("'")[0] if "'" in producer_name else producer_name[:8]
+                debug_mapping.append(f"{label}={short_name}")
+            consumer_views.append((shuffled_offerings, consumer_label_to_producer, debug_mapping))
         
-        enticement = choice.get("enticement_score", 5)
-        persist_choice(conn, tick_id, consumer.id, chosen_id, enticement)
-    
-    # 10. Compute and persist stats
-    print("\n📈 Phase 4: Round Statistics")
-    compute_and_persist_stats(conn, tick_id, producers)
-    
-    # 11. Mark tick complete
-    complete_tick(conn, tick_id)
-    
-    elapsed = time.time() - tick_start_time
-    print(f"\n🎉 Tick complete! (⏱️ {elapsed:.1f}s)")
+        # Pick each consumer's view first, then query the LLM concurrently
+        consumer_requests = [(consumer, *random.choice(consumer_views)) for consumer in consumers]
+        
+        with ThreadPoolExecutor(max_workers=max(min(len(consumers), LLM_MAX_WORKERS), 1)) as executor:
+            # map() yields results in consumer order
+            choices = list(executor.map(lambda request: consumer_llm_choose(*request), consumer_requests))
+        
+        consumer_choices: list[ConsumerChoice] = []
+        for consumer, choice in zip(consumers, choices):
+            chosen_name = choice.get("chosen_producer", "")
+            chosen_id = producer_name_to_id.get(chosen_name)
+        
+            if chosen_id is None:
+                # Fallback: random choice
+                chosen_id = random.choice(producers).id
+                print(f"  ⚠️ Consumer #{consumer.id} made invalid choice, randomly assigned")
+        
+            enticement = choice.get("enticement_score", 5)
+            consumer_choices.append(ConsumerChoice(
+                consumer_id=consumer.id,
+                producer_id=chosen_id,
+                enticement_score=enticement
+            ))
+        
+        persist_choices(cur, tick_id, consumer_choices)
+        
+        # 10. Compute and persist stats
+        print("\n📈 Phase 4: Round Statistics")
+        compute_and_persist_stats(cur, tick_id, producers)
+        
+        # 11. Mark tick complete
+        complete_tick(cur, tick_id)
+        
+        elapsed = time.time() - tick_start_time
+        print(f"\n🎉 Tick complete! (⏱️ {elapsed:.1f}s)")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
 
 # =============================================================================
 # Entry Point
@@ -1049,7 +1153,7 @@ def main():
     
     print(f"🔗 Connecting to PostgreSQL at {DB_HOST}:{DB_PORT}/{DB_NAME}...")
     try:
-        conn = psycopg2.connect(
+        conn = psycopg.connect(
             host=DB_HOST,
             port=DB_PORT,
             dbname=DB_NAME,
@@ -1057,7 +1161,7 @@ def main():
             password=DB_PASSWORD
         )
         print("✅ Connected to PostgreSQL!")
-    except psycopg2.Error as e:
+    except psycopg.Error as e:
         print(f"❌ Failed to connect to PostgreSQL: {e}")
         return
     
@@ -1072,7 +1176,7 @@ def main():
         cur = conn.cursor()
         cur.execute("SELECT 1 FROM producers LIMIT 1")
         cur.close()
-    except psycopg2.Error:
+    except psycopg.Error:
         print("Database not initialized. Run with --init first.")
         conn.close()
         return
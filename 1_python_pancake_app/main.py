@@ -1,15 +1,17 @@
 import os
 import asyncio
+from decimal import Decimal
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Numeric, DateTime, Text, select, text
+from sqlalchemy import Column, Integer, String, Boolean, Numeric, Float, DateTime, Text, func, insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime
 import logging
+import orjson
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,26 +25,48 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "happy_pancakes")
 
 # Construct database URL
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 logger.info(f"Connecting to database at {DB_HOST}:{DB_PORT}/{DB_NAME}")
 
-# SQLAlchemy setup
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connections the whole service may hold across its uvicorn workers - under
+# CloudNativePG's default max_connections (100), leaving room for other clients.
+# Each worker gets an equal share, half as pool and half as overflow
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "80"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+_worker_connections = max(DB_CONNECTION_BUDGET // WEB_CONCURRENCY, 2)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(_worker_connections // 2)))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(_worker_connections - _worker_connections // 2)))
+DB_STATEMENT_TIMEOUT_MS = os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+
+# SQLAlchemy setup - async engine on asyncpg, so handlers await DB round trips
+# instead of blocking the event loop
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,   # drop connections Postgres has closed before handing them out
+    pool_recycle=1800,
+    # UTC sessions, so server-side now() defaults land in TIMESTAMP columns as UTC
+    connect_args={"server_settings": {"statement_timeout": DB_STATEMENT_TIMEOUT_MS, "timezone": "UTC"}},
+)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # Define the Pancake model
 class Pancake(Base):
     __tablename__ = "pancakes"
     
+    # id (SERIAL) and created_at are filled in by Postgres, so inserts never
+    # send them and RETURNING hands back the generated values
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     fluffiness_level = Column(Integer, nullable=True)
     syrup_type = Column(String(100), nullable=True)
     is_buttery = Column(Boolean, default=True)
     magical_factor = Column(Numeric(5, 2), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
     taste_notes = Column(Text, nullable=True)
 
 # Pydantic models for API requests/responses
@@ -67,6 +91,9 @@ class PancakeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PancakeBulkResult(BaseModel):
+    created: int
+
 # FastAPI app
 app = FastAPI(title="Pancake Backend", description="A magical pancake database service")
 
@@ -80,20 +107,17 @@ app.add_middleware(
 )
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database connection on startup"""
     logger.info("Starting up Pancake Backend service...")
     try:
-        with engine.connect() as connection:
-            connection.execute(text("SELECT 1"))
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
         logger.info("Database connection successful!")
     except Exception as e:
         logger.error(f"Failed to connect to database: {e}")
@@ -113,20 +137,81 @@ async def serve_index():
         return FileResponse(index_path)
     return {"message": "Welcome to Pancake Palace!"}
 
+# Plain row mappings instead of hydrating ORM objects; magical_factor is cast so
+# orjson can encode it, and created_at (naive, filled in by UTC
+# sessions) goes out tagged as UTC
+PANCAKE_ROWS = select(
+    Pancake.id,
+    Pancake.name,
+    Pancake.fluffiness_level,
+    Pancake.syrup_type,
+    Pancake.is_buttery,
+    Pancake.magical_factor.cast(Float).label("magical_factor"),
+    Pancake.created_at,
+    Pancake.taste_notes,
+).execution_options(yield_per=1000)
+
+def encode_pancake(row) -> bytes:
+    """Encode one PANCAKE_ROWS-shaped mapping; shared by every endpoint returning pancakes."""
+    return orjson.dumps(dict(row), option=orjson.OPT_NAIVE_UTC)
+
+async def stream_pancakes_json():
+    """Yield the pancakes as one JSON array, encoded 1000 rows at a time."""
+    # Owns its session: the response body is produced after the handler returns
+    async with SessionLocal() as db:
+        result = await db.stream(PANCAKE_ROWS)
+        yield b"["
+        first = True
+        async for batch in result.mappings().partitions():
+            chunk = b",".join(encode_pancake(row) for row in batch)
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
+
 @app.get("/api/pancakes", response_model=list[PancakeResponse])
-async def get_all_pancakes(db: Session = Depends(get_db)):
+async def get_all_pancakes():
     """Get all pancakes"""
-    pancakes = db.query(Pancake).all()
-    return pancakes
+    # Streamed from a server-side cursor: constant memory and the first bytes go
+    # out as soon as the first batch arrives, instead of after the whole table.
+    # Returning a Response directly skips per-row Pydantic validation
+    # (response_model still documents the shape).
+    return StreamingResponse(stream_pancakes_json(), media_type="application/json")
+
+# Core INSERT ... RETURNING built once: one round trip instead of INSERT plus
+# refresh SELECT, and no ORM identity-map/attribute-history work per pancake.
+# Core still applies the Python-side is_buttery default. RETURNING uses the same
+# columns as PANCAKE_ROWS so the created pancake is encoded like the listed ones
+INSERT_PANCAKE = insert(Pancake.__table__).returning(*PANCAKE_ROWS.selected_columns)
 
 @app.post("/api/pancakes", response_model=PancakeResponse)
-async def create_pancake(pancake: PancakeCreate, db: Session = Depends(get_db)):
+async def create_pancake(pancake: PancakeCreate, db: AsyncSession = Depends(get_db)):
     """Create a new pancake"""
-    db_pancake = Pancake(**pancake.dict())
-    db.add(db_pancake)
-    db.commit()
-    db.refresh(db_pancake)
-    return db_pancake
+    result = await db.execute(INSERT_PANCAKE, pancake.dict())
+    row = result.mappings().one()
+    await db.commit()
+    return Response(encode_pancake(row), media_type="application/json")
+
+@app.post("/api/pancakes/bulk", response_model=PancakeBulkResult)
+async def create_pancakes_bulk(pancakes: list[PancakeCreate], db: AsyncSession = Depends(get_db)):
+    """Create many pancakes with a single COPY instead of one INSERT + commit each"""
+    # created_at is left out so every row gets the server-side default
+    records = [
+        (pancake.name, pancake.fluffiness_level, pancake.syrup_type, pancake.is_buttery,
+         None if pancake.magical_factor is None else Decimal(str(pancake.magical_factor)),
+         pancake.taste_notes)
+        for pancake in pancakes
+    ]
+    
+    # Binary COPY on the session's underlying asyncpg connection
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "pancakes",
+        records=records,
+        columns=["name", "fluffiness_level", "syrup_type", "is_buttery", "magical_factor", "taste_notes"],
+    )
+    await db.commit()
+    return {"created": len(pancakes)}
 
 # Serve static files
 import pathlib
@@ -174,32 +174,29 @@ async function generateRandomPancakes() {
     const btn = document.getElementById('bulkGenerateBtn');
     const originalText = btn.textContent;
     btn.disabled = true;
-    btn.textContent = '⏳ Creating... 0/10';
+    btn.textContent = '⏳ Creating...';
 
     let successCount = 0;
     let failureCount = 0;
 
-    for (let i = 0; i < pancakesToCreate.length; i++) {
-        try {
-            const response = await fetch(`${API_BASE}/pancakes`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(pancakesToCreate[i])
-            });
-
-            if (response.ok) {
-                successCount++;
-            } else {
-                failureCount++;
-            }
-        } catch (error) {
-            console.error('Error creating pancake:', error);
-            failureCount++;
-        }
+    // One request - the backend writes the whole batch with a single COPY
+    try {
+        const response = await fetch(`${API_BASE}/pancakes/bulk`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(pancakesToCreate)
+        });
 
-        btn.textContent = `⏳ Creating... ${successCount + failureCount}/10`;
+        if (response.ok) {
+            successCount = (await response.json()).created;
+        } else {
+            failureCount = pancakesToCreate.length;
+        }
+    } catch (error) {
+        console.error('Error creating pancakes:', error);
+        failureCount = pancakesToCreate.length;
     }
 
     btn.disabled = false;
@@ -0,0 +1,107 @@
+import contextlib
+import functools
+import os
+import queue
+import urllib.parse
+
+import duckdb
+
+DB_USER = "pancake_db_reader_writer"
+DB_PASSWORD = "supersecretpasswordoftheages"
+DB_HOST = os.getenv("DB_HOST", "local-postgres-rw")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME", "happy_pancakes")
+
+LOCAL_TESTING_LAKEKEEPER_URI = "http://localhost:8181/catalog"
+LOCAL_TESTING_MINIO_ENDPOINT = "http://192.168.64.2:30900"
+LAKEKEEPER_URI = os.getenv("LAKEKEEPER_URI", LOCAL_TESTING_LAKEKEEPER_URI)
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", LOCAL_TESTING_MINIO_ENDPOINT)
+WAREHOUSE = os.getenv("WAREHOUSE", "iceberg-lakehouse-local")
+
+# Multipart upload shape for data files written to MinIO. Part size is
+# max_filesize / max_parts: 128GB / 10000 gives ~13MB parts (the 800GB default
+# gives ~80MB), so even modest Parquet files split into parts that upload in
+# parallel on the uploader's threads
+S3_UPLOADER_MAX_FILESIZE = os.getenv("S3_UPLOADER_MAX_FILESIZE", "128GB")
+S3_UPLOADER_MAX_PARTS_PER_FILE = int(os.getenv("S3_UPLOADER_MAX_PARTS_PER_FILE", "10000"))
+
+# Source Postgres as reached from here (NodePort on the local cluster).
+# attach_postgres() hands these to a DuckDB secret; connectorx only takes a
+# URI, so PG_URI is built from the same values with each part percent-quoted
+PG_HOST = os.getenv("PG_HOST", "192.168.64.2")
+PG_PORT = int(os.getenv("PG_PORT", "30042"))
+PG_URI = (
+    f"postgresql://{urllib.parse.quote(DB_USER, safe='')}:{urllib.parse.quote(DB_PASSWORD, safe='')}"
+    f"@{PG_HOST}:{PG_PORT}/{urllib.parse.quote(DB_NAME, safe='')}"
+)
+
+
+@functools.lru_cache(maxsize=1)
+def get_con():
+    """
+    Process-wide DuckDB connection with the iceberg extension loaded and the
+    Lakekeeper catalog attached. Built on first use; every later caller (or a
+    long-running orchestrator importing several scripts) reuses it instead of
+    repeating the extension load and the REST catalog handshake.
+    """
+    con = duckdb.connect()
+    con.execute(f"""
+        INSTALL iceberg;
+        LOAD iceberg;
+        INSTALL httpfs;
+        LOAD httpfs;
+
+        SET s3_uploader_max_filesize = '{S3_UPLOADER_MAX_FILESIZE}';
+        SET s3_uploader_max_parts_per_file = {S3_UPLOADER_MAX_PARTS_PER_FILE};
+
+        ATTACH '{WAREHOUSE}' AS lakekeeper_catalog (
+            TYPE iceberg,
+            ENDPOINT '{LAKEKEEPER_URI}',
+            AUTHORIZATION_TYPE 'none'
+        );
+    """)
+    return con
+
+
+def attach_postgres(con):
+    """Attach the source Postgres database as postgres_db (no-op if already attached)."""
+    con.execute("""
+        INSTALL postgres;
+        LOAD postgres;
+    """)
+    # Connection details live in a secret, bound as parameters, so the password
+    # never appears in statement text and the ATTACH below is a constant statement
+    con.execute("""
+        CREATE SECRET IF NOT EXISTS pg_secret (
+            TYPE postgres,
+            HOST $host,
+            PORT $port,
+            DATABASE $database,
+            USER $user,
+            PASSWORD $password
+        )
+    """, {"host": PG_HOST, "port": PG_PORT, "database": DB_NAME, "user": DB_USER, "password": DB_PASSWORD})
+    con.execute("ATTACH IF NOT EXISTS '' AS postgres_db (TYPE postgres, SECRET pg_secret)")
+
+
+class ConnectionPool:
+    """
+    Fixed set of DuckDB connections for running queries concurrently - a single
+    connection executes one query at a time. The connections are cursors on
+    get_con()'s database, so they share its loaded extensions and attached
+    catalogs without repeating the setup.
+    """
+
+    def __init__(self, size=4):
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(get_con().cursor())
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Borrow a connection, blocking until one is free."""
+        con = self._idle.get()
+        try:
+            yield con
+        finally:
+            self._idle.put(con)
@@ -1,43 +1,83 @@
-import duckdb
+import connectorx as cx
 import os
 
-DB_USER = "pancake_db_reader_writer"
-DB_PASSWORD = "supersecretpasswordoftheages"
-DB_HOST = os.getenv("DB_HOST", "local-postgres-rw")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "happy_pancakes")
+from duckdb_common import PG_URI, attach_postgres, get_con
 
-LOCAL_TESTING_LAKEKEEPER_URI = "http://localhost:8181/catalog"
-LOCAL_TESTING_MINIO_ENDPOINT = "http://192.168.64.2:30900"
-LAKEKEEPER_URI = os.getenv("LAKEKEEPER_URI", LOCAL_TESTING_LAKEKEEPER_URI)
-MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", LOCAL_TESTING_MINIO_ENDPOINT)
-WAREHOUSE = os.getenv("WAREHOUSE", "iceberg-lakehouse-local")
+EXTRACT_CHUNK_ROWS = int(os.getenv("EXTRACT_CHUNK_ROWS", "100000"))
+EXTRACT_PARTITIONS = int(os.getenv("EXTRACT_PARTITIONS", "8"))
+EXTRACT_THREADS = int(os.getenv("EXTRACT_THREADS", "16"))
 
 
-with duckdb.connect() as con:
-    con.execute(f"""
-        INSTALL postgres;
-        LOAD postgres;    
-        INSTALL iceberg;
-        LOAD iceberg;
+def read_pg_range(table, key, lo, hi, partitions=EXTRACT_PARTITIONS):
+    """
+    Read the (lo, hi] key range of a Postgres table straight into Arrow.
+    connectorx splits the range into `partitions` parallel binary-protocol
+    reads and decodes into Arrow buffers, which DuckDB then scans zero-copy.
+    """
+    return cx.read_sql(
+        PG_URI,
+        f"SELECT * FROM {table} WHERE {key} > {lo} AND {key} <= {hi}",
+        return_type="arrow",
+        partition_on=key,
+        partition_num=partitions,
+    )
 
-        ATTACH 'dbname=happy_pancakes user={DB_USER} password={DB_PASSWORD} port=30042 host=192.168.64.2' AS postgres_db (TYPE postgres);
-        
-        ATTACH '{WAREHOUSE}' AS lakekeeper_catalog (
-            TYPE iceberg,
-            ENDPOINT '{LAKEKEEPER_URI}',
-            AUTHORIZATION_TYPE 'none'
-        );    
-    """)
 
-    con.execute(f"""   
-        CREATE SCHEMA IF NOT EXISTS lakekeeper_catalog.pancake_analytics;
-        
+con = get_con()
+attach_postgres(con)
+
+# Row order doesn't matter for the lake copy, and dropping the ordering
+# guarantee lets the Arrow batches below stream into the writer in parallel
+con.execute(f"""
+    SET preserve_insertion_order = false;
+    SET threads = {EXTRACT_THREADS};
+""")
+
+con.execute("CREATE SCHEMA IF NOT EXISTS lakekeeper_catalog.pancake_analytics;")
+
+# Replace the table in one transaction: readers never see it half loaded,
+# the catalog gets one commit instead of one snapshot per chunk, and a
+# failure leaves the previous copy in place
+con.begin()
+try:
+    # Create the target empty (schema only), then copy it over in id-ordered
+    # chunks so memory stays bounded by EXTRACT_CHUNK_ROWS, not the table size
+    con.execute("""
         DROP TABLE IF EXISTS lakekeeper_catalog.pancake_analytics.pancakes;
         
         CREATE TABLE lakekeeper_catalog.pancake_analytics.pancakes AS 
-        SELECT * FROM postgres_db.pancakes;
+        SELECT * FROM postgres_db.pancakes LIMIT 0;
     """)
 
+    # Keyset pagination on the primary key - each chunk is an id range, so the
+    # Postgres side is an index range scan; the bulk rows come in via connectorx/Arrow.
+    # The boundary probe runs entirely in Postgres through postgres_query: ORDER BY
+    # and LIMIT are not pushed down through the attached table, which would ship
+    # every remaining id across the wire for each chunk
+    last_id = 0
+    while True:
+        chunk_end = con.execute(f"""
+            SELECT * FROM postgres_query('postgres_db', '
+                SELECT max(id) FROM (
+                    SELECT id FROM pancakes WHERE id > {int(last_id)} ORDER BY id LIMIT {int(EXTRACT_CHUNK_ROWS)}
+                ) AS chunk
+            ')
+        """).fetchone()[0]
+        if chunk_end is None:
+            break
+        pancakes_arrow = read_pg_range("pancakes", "id", last_id, chunk_end)
+        con.register("pancakes_arrow", pancakes_arrow)
+        con.execute("INSERT INTO lakekeeper_catalog.pancake_analytics.pancakes SELECT * FROM pancakes_arrow")
+        con.unregister("pancakes_arrow")
+        print(f"📦 Copied pancakes with id {last_id + 1}-{chunk_end}")
+        last_id = chunk_end
+
+    con.commit()
+except Exception as e:
+    con.rollback()
+    print(f"❌ Extraction failed - {e}")
+    print("↩️  Rolled back, the previous pancakes table is unchanged")
+    raise
+
 print("✨ Pipeline complete! Pancake data extracted to Iceberg via Lakekeeper ✨")
 
@@ -1,32 +1,31 @@
-import duckdb
-import os
-
-LOCAL_TESTING_LAKEKEEPER_URI = "http://localhost:8181/catalog"
-LOCAL_TESTING_MINIO_ENDPOINT = "http://192.168.64.2:30900"
-LAKEKEEPER_URI = os.getenv("LAKEKEEPER_URI", LOCAL_TESTING_LAKEKEEPER_URI)
-MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", LOCAL_TESTING_MINIO_ENDPOINT)
-WAREHOUSE = os.getenv("WAREHOUSE", "iceberg-lakehouse-local")
-
-
-with duckdb.connect() as con:
-    con.execute(f"""
-        INSTALL iceberg;
-        LOAD iceberg;
-        
-        ATTACH '{WAREHOUSE}' AS lakekeeper_catalog (
-            TYPE iceberg,
-            ENDPOINT '{LAKEKEEPER_URI}',
-            AUTHORIZATION_TYPE 'none'
-        );    
-    """)
-    con.execute(f"""   
-        DROP TABLE IF EXISTS lakekeeper_catalog.pancake_analytics.pancakes;
-        DROP TABLE IF EXISTS lakekeeper_catalog.pancake_analytics.stg_pancakes;
-        DROP TABLE IF EXISTS lakekeeper_catalog.pancake_analytics.src_postgres__pancakes_raw;
-
-        DROP TABLE IF EXISTS lakekeeper_catalog.main.pancakes;
-        DROP TABLE IF EXISTS lakekeeper_catalog.main.stg_pancakes;
-        DROP TABLE IF EXISTS lakekeeper_catalog.main.src_postgres__pancakes_raw;                
-    """)
-print("✨ Pipeline nuked! ✨")
+from concurrent.futures import ThreadPoolExecutor
+
+from duckdb_common import ConnectionPool, get_con
+
+NUKE_SCHEMAS = ("pancake_analytics", "main")
+NUKE_POOL_SIZE = 8
+
+# One catalog listing up front, instead of a blind DROP per known table name
+tables = get_con().execute("""
+    SELECT table_schema, table_name
+    FROM information_schema.tables
+    WHERE table_catalog = 'lakekeeper_catalog' AND table_schema IN (?, ?)
+""", list(NUKE_SCHEMAS)).fetchall()
+
+pool = ConnectionPool(size=NUKE_POOL_SIZE)
 
+
+def drop_table(row):
+    """Drop one (schema, table) on a pooled connection - each drop is a catalog round trip."""
+    schema, table = row
+    with pool.acquire() as con:
+        con.execute(f'DROP TABLE IF EXISTS lakekeeper_catalog."{schema}"."{table}"')
+    return f"{schema}.{table}"
+
+
+# The drops are independent, so they overlap instead of queueing on catalog latency
+with ThreadPoolExecutor(max_workers=NUKE_POOL_SIZE) as executor:
+    for dropped in executor.map(drop_table, tables):
+        print(f"🗑️ Dropped {dropped}")
+
+print("✨ Pipeline nuked! ✨")
@@ -1,38 +1,40 @@
-import duckdb
-import os
-
-DB_USER = "pancake_db_reader_writer"
-DB_PASSWORD = "supersecretpasswordoftheages"
-DB_HOST = os.getenv("DB_HOST", "local-postgres-rw")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "happy_pancakes")
-
-LOCAL_TESTING_LAKEKEEPER_URI = "http://localhost:8181/catalog"
-LOCAL_TESTING_MINIO_ENDPOINT = "http://192.168.64.2:30900"
-LAKEKEEPER_URI = os.getenv("LAKEKEEPER_URI", LOCAL_TESTING_LAKEKEEPER_URI)
-MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", LOCAL_TESTING_MINIO_ENDPOINT)
-WAREHOUSE = os.getenv("WAREHOUSE", "iceberg-lakehouse-local")
-
-
-with duckdb.connect() as con:
-    con.execute(f"""
-        ATTACH '{WAREHOUSE}' AS lakekeeper_catalog (
-            TYPE iceberg,
-            ENDPOINT '{LAKEKEEPER_URI}',
-            AUTHORIZATION_TYPE 'none'
-        );    
-    """)
-
-    # con.sql(f"""   
-    #     SELECT * FROM lakekeeper_catalog.pancake_analytics.stg_pancakes;
-    # """).show()
+from concurrent.futures import ThreadPoolExecutor
+
+from duckdb_common import ConnectionPool, get_con
+
+QUERY_POOL_SIZE = 4
 
-    con.sql(f"""
+# One query per dashboard panel; they run concurrently on pooled connections
+PANELS = {
+    "Average magical factor by fluffiness": """
         select fluffiness_level, avg(magical_factor) as avg_magical_factor
         from lakekeeper_catalog.pancake_analytics.stg_pancakes
         group by fluffiness_level
         order by fluffiness_level
-    """).show()
+    """,
+    # "Staged pancakes": """
+    #     SELECT * FROM lakekeeper_catalog.pancake_analytics.stg_pancakes;
+    # """,
+}
 
-print("✨ Pipeline complete! Pancake data extracted to Iceberg via Lakekeeper ✨")
+# Cache HTTP object metadata so repeated panel scans of the same Iceberg data
+# files skip the per-file HEAD round trip to MinIO. Remote Parquet reads are
+# already prefetched/coalesced by default (disable_parquet_prefetching=false).
+get_con().execute("SET GLOBAL enable_http_metadata_cache = true;")
+
+pool = ConnectionPool(size=QUERY_POOL_SIZE)
 
+
+def run_panel(sql):
+    """Run one panel's query on a pooled connection and return it rendered as a table."""
+    with pool.acquire() as con:
+        return str(con.sql(sql))
+
+
+with ThreadPoolExecutor(max_workers=QUERY_POOL_SIZE) as executor:
+    results = executor.map(run_panel, PANELS.values())
+    for title, rendered in zip(PANELS, results):
+        print(f"📊 {title}")
+        print(rendered)
+
+print("✨ Pipeline complete! Pancake data extracted to Iceberg via Lakekeeper ✨")